@@ -8,20 +8,51 @@ GRANT ALL PRIVILEGES ON DATABASE $POSTGRES_DB TO $POSTGRES_USER;
 CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE;
 CREATE TABLE IF NOT EXISTS ticker (
   timestamp TIMESTAMP           NOT NULL,
+  symbol    TEXT                NOT NULL,
   mark      DOUBLE PRECISION    NOT NULL,
   ask       DOUBLE PRECISION    NOT NULL,
   bid       DOUBLE PRECISION    NOT NULL,
-  vol       DOUBLE PRECISION    NOT NULL
+  vol       DOUBLE PRECISION    NOT NULL,
+  PRIMARY KEY (symbol, timestamp)
 );
 CREATE TABLE IF NOT EXISTS ohlc (
   timestamp TIMESTAMP           NOT NULL,
+  symbol    TEXT                NOT NULL,
+  frequency TEXT                NOT NULL,
   open      DOUBLE PRECISION    NOT NULL,
   high      DOUBLE PRECISION    NOT NULL,
   low       DOUBLE PRECISION    NOT NULL,
   close     DOUBLE PRECISION    NOT NULL,
-  vol    DOUBLE PRECISION    NOT NULL
+  vol       DOUBLE PRECISION    NOT NULL,
+  PRIMARY KEY (symbol, frequency, timestamp)
 );
-SELECT create_hypertable('ticker', 'timestamp');
-SELECT create_hypertable('ohlc', 'timestamp');
+-- [start, stop) ranges of ohlc known to be complete (backfilled from the API)
+CREATE TABLE IF NOT EXISTS ohlc_coverage (
+  symbol    TEXT                NOT NULL,
+  frequency TEXT                NOT NULL,
+  start     TIMESTAMP           NOT NULL,
+  stop      TIMESTAMP           NOT NULL,
+  PRIMARY KEY (symbol, frequency, start)
+);
+-- partition by time and by symbol, the primary keys index (symbol[, frequency], timestamp) range scans
+SELECT create_hypertable('ticker', 'timestamp', 'symbol', 4, create_default_indexes => FALSE);
+SELECT create_hypertable('ohlc', 'timestamp', 'symbol', 4, create_default_indexes => FALSE);
+-- 1h and 1d candles resampled from the 1m ones, served by Database with HISTORY_AGGREGATES=1h,1d
+CREATE MATERIALIZED VIEW IF NOT EXISTS ohlc_1h WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+  SELECT symbol, time_bucket(INTERVAL '1 hour', timestamp) AS timestamp,
+    first(open, timestamp) AS open, max(high) AS high, min(low) AS low,
+    last(close, timestamp) AS close, sum(vol) AS vol
+  FROM ohlc WHERE frequency = '1m'
+  GROUP BY symbol, time_bucket(INTERVAL '1 hour', timestamp)
+  WITH NO DATA;
+CREATE MATERIALIZED VIEW IF NOT EXISTS ohlc_1d WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+  SELECT symbol, time_bucket(INTERVAL '1 day', timestamp) AS timestamp,
+    first(open, timestamp) AS open, max(high) AS high, min(low) AS low,
+    last(close, timestamp) AS close, sum(vol) AS vol
+  FROM ohlc WHERE frequency = '1m'
+  GROUP BY symbol, time_bucket(INTERVAL '1 day', timestamp)
+  WITH NO DATA;
+SELECT add_continuous_aggregate_policy('ohlc_1h', start_offset => NULL, end_offset => INTERVAL '1 hour', schedule_interval => INTERVAL '1 hour');
+SELECT add_continuous_aggregate_policy('ohlc_1d', start_offset => NULL, end_offset => INTERVAL '1 day', schedule_interval => INTERVAL '1 day');
 EOF
 
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: two tier (memory LRU + disk) cache of history query results
+
+"""
+import contextlib
+from datetime import datetime
+import glob
+import os
+from typing import Optional, Set, Tuple
+
+from utils.tiered_cache import TieredCache
+
+# (symbol, frequency, start, stop)
+Key = Tuple[str, str, datetime, datetime]
+
+
+class HistoryCache(TieredCache):
+    """Columnar candle frames of past, fully covered ranges
+
+    Frames are kept in memory and on disk (`.ohlcv` files) by `TieredCache`,
+    and dropped from both when the stored candles of their range change.
+    """
+
+    suffix = ".ohlcv"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.invalidations = 0
+
+    def stats(self) -> dict:
+        return {**super().stats(), "invalidations": self.invalidations}
+
+    def path(self, key: Key) -> str:
+        symbol, frequency, start, stop = key
+        return os.path.join(self.directory, f"{symbol}-{frequency}-{start:%Y%m%d%H%M}-{stop:%Y%m%d%H%M}.ohlcv")
+
+    def invalidate(self, symbol: str, frequencies: Optional[Set[str]], start: datetime, stop: datetime):
+        """Drop the entries of `symbol` at any of `frequencies` (None for all) overlapping `[start, stop)`"""
+        def stale(key: Key) -> bool:
+            return key[0] == symbol and (frequencies is None or key[1] in frequencies) \
+                and key[2] < stop and start < key[3]
+
+        for key in list(filter(stale, self.entries)):
+            self.forget(key)
+            self.invalidations += 1
+        if self.directory:
+            for file in glob.glob(os.path.join(self.directory, f"{symbol}-*.ohlcv")):
+                _, frequency, file_start, file_stop = os.path.basename(file)[:-len(".ohlcv")].rsplit("-", 3)
+                key = (symbol, frequency, datetime.strptime(file_start, "%Y%m%d%H%M"),
+                       datetime.strptime(file_stop, "%Y%m%d%H%M"))
+                if stale(key):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(file)
+                        self.invalidations += 1
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: incremental OHLCV candle builder with multi-timeframe rollups
+
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+
+# candle frequencies (in seconds) emitted by the stream
+FREQUENCIES = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "4h": 4 * 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+# seconds per unit of a binance interval, eg: "15m", "4h", "3d"
+UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60, "w": 7 * 24 * 60 * 60}
+
+# NOTE: the epoch is a thursday, binance weeks start on monday 00:00 UTC
+WEEK_OFFSET = 4 * 24 * 60 * 60
+
+
+def frequency_seconds(frequency: str) -> int:
+    """Period (in seconds) of a fixed length binance interval
+
+    NOTE: monthly candles ("1M") have no fixed period and are rejected
+    """
+    if frequency in FREQUENCIES:
+        return FREQUENCIES[frequency]
+    count, unit = frequency[:-1], frequency[-1:]
+    if not count.isdigit() or unit not in UNITS or int(count) == 0:
+        raise ValueError(f"unsupported frequency {frequency!r}")
+    return int(count) * UNITS[unit]
+
+
+def align(timestamp: float, period: int, up: bool = False) -> float:
+    """Start (epoch seconds) of the `period` candle `timestamp` falls in, or of the next one if `up`
+
+    Candles are aligned on the epoch like binance's, weekly ones on mondays.
+    """
+    offset = WEEK_OFFSET if period % UNITS["w"] == 0 else 0
+    if up:
+        return timestamp + (offset - timestamp) % period
+    return timestamp - (timestamp - offset) % period
+
+
+def calendar(frequency: str) -> bool:
+    """Whether a binance interval follows the calendar ("1M" months) instead of a fixed period"""
+    return frequency[-1:] == "M" and frequency[:-1].isdigit()
+
+
+def longest_seconds(frequency: str) -> int:
+    """Upper bound (in seconds) of the period of a binance interval, months counted as 31 days"""
+    if calendar(frequency):
+        return int(frequency[:-1]) * 31 * UNITS["d"]
+    return frequency_seconds(frequency)
+
+
+class Candle:
+    """Running OHLCV accumulator for a single period"""
+
+    __slots__ = ("period", "start", "open", "high", "low", "close", "vol", "complete")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.start = None
+
+    def reset(self, start: int, o: float, h: float, l: float, c: float, v: float, complete: bool = True):
+        """Start a new candle at epoch second `start`"""
+        self.start = start
+        self.open, self.high, self.low, self.close, self.vol = o, h, l, c, v
+        self.complete = complete
+
+    def add_tick(self, price: float, vol: float):
+        """Update the running candle with a single tick"""
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.vol += vol
+
+    def merge(self, candle: "Candle"):
+        """Update the running candle with a finished lower timeframe candle"""
+        if candle.high > self.high:
+            self.high = candle.high
+        if candle.low < self.low:
+            self.low = candle.low
+        self.close = candle.close
+        self.vol += candle.vol
+        self.complete = self.complete and candle.complete
+
+    def to_dict(self) -> dict:
+        """Serialize the candle in the `{t, o, h, l, c, v}` message format"""
+        return {
+            't': datetime.fromtimestamp(self.start),
+            'o': self.open,
+            'h': self.high,
+            'l': self.low,
+            'c': self.close,
+            'v': self.vol,
+        }
+
+
+class CandleBuilder:
+    """Build 1m candles from ticks in O(1) and roll them up into higher timeframes"""
+
+    def __init__(self, frequencies: Dict[str, int] = FREQUENCIES):
+        """Initialize one accumulator per frequency
+
+        :Params:
+            - frequencies: {frequency: period in seconds}, the smallest period
+              is built from ticks and every other one is rolled up from it
+        """
+        (self.base_frequency, period), *rollups = sorted(
+            frequencies.items(), key=lambda item: item[1])
+        self.base = Candle(period)
+        self.rollups = [(frequency, Candle(period)) for frequency, period in rollups]
+
+    def update(self, timestamp: int, price: float, vol: float) -> List[Tuple[str, dict]]:
+        """Add a tick at epoch second `timestamp` and return any candles it closed
+
+        NOTE: partial candles (the stream started mid-period) are never emitted
+        """
+        base = self.base
+        start = timestamp - timestamp % base.period
+        if base.start is None:
+            base.reset(start, price, price, price, price, vol, complete=timestamp == start)
+            return []
+        if start <= base.start:
+            base.add_tick(price, vol)
+            return []
+
+        closed = [(self.base_frequency, base.to_dict())] if base.complete else []
+        closed.extend(self.rollup())
+        base.reset(start, price, price, price, price, vol)
+        return closed
+
+    def rollup(self) -> List[Tuple[str, dict]]:
+        """Merge the just-closed base candle into every higher timeframe"""
+        base, closed = self.base, []
+        end = base.start + base.period
+        for frequency, candle in self.rollups:
+            bucket = base.start - base.start % candle.period
+            if candle.start != bucket:
+                # NOTE: a bucket left open here missed its closing candle (stream gap)
+                candle.reset(bucket, base.open, base.high, base.low, base.close, base.vol,
+                             complete=base.complete and base.start == bucket)
+            else:
+                candle.merge(base)
+            if end >= bucket + candle.period:
+                if candle.complete:
+                    closed.append((frequency, candle.to_dict()))
+                candle.start = None
+        return closed
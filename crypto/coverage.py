@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: index of the time ranges stored in the ohlc table
+
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+import asyncpg
+
+
+class IntervalSet:
+    """Sorted, disjoint `[start, stop)` intervals, adjacent ones are merged"""
+
+    def __init__(self, intervals: List[Tuple[datetime, datetime]] = ()):
+        self.starts, self.stops = [], []
+        for start, stop in intervals:
+            self.add(start, stop)
+
+    def __iter__(self) -> Iterator[Tuple[datetime, datetime]]:
+        return iter(zip(self.starts, self.stops))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start: datetime, stop: datetime):
+        """Mark `[start, stop)` as covered"""
+        if start >= stop:
+            return
+        # first interval ending at/after `start` and first one starting after `stop`
+        lo, hi = bisect_left(self.stops, start), bisect_right(self.starts, stop)
+        if lo < hi:
+            start, stop = min(start, self.starts[lo]), max(stop, self.stops[hi - 1])
+        self.starts[lo:hi], self.stops[lo:hi] = [start], [stop]
+
+    def missing(self, start: datetime, stop: datetime) -> List[Tuple[datetime, datetime]]:
+        """Sub-ranges of `[start, stop)` that are not covered, in order"""
+        gaps = []
+        for i in range(bisect_right(self.stops, start), len(self.starts)):
+            if self.starts[i] >= stop:
+                break
+            if self.starts[i] > start:
+                gaps.append((start, self.starts[i]))
+            start = max(start, self.stops[i])
+        if start < stop:
+            gaps.append((start, stop))
+        return gaps
+
+    def covers(self, start: datetime, stop: datetime) -> bool:
+        """Whether all of `[start, stop)` is covered"""
+        return not self.missing(start, stop)
+
+
+class Coverage:
+    """Per symbol/frequency coverage of the ohlc table, backed by `ohlc_coverage`
+
+    Only ranges written in full (eg: a REST backfill) are recorded, candles
+    streamed live may have holes and are never marked as covered.
+    """
+
+    def __init__(self):
+        self.index: Dict[Tuple[str, str], IntervalSet] = {}
+
+    async def get(self, conn: asyncpg.Connection, symbol: str, frequency: str) -> IntervalSet:
+        """Coverage of a symbol/frequency, loaded from the db on first use"""
+        key = (symbol, frequency)
+        if key not in self.index:
+            rows = await conn.fetch("""
+                    SELECT start, stop FROM ohlc_coverage
+                    WHERE symbol = $1 AND frequency = $2
+                """, symbol, frequency)
+            self.index[key] = IntervalSet((row["start"], row["stop"]) for row in rows)
+        return self.index[key]
+
+    async def add(self, conn: asyncpg.Connection, symbol: str, frequency: str,
+                  intervals: List[Tuple[datetime, datetime]]):
+        """Record newly written ranges, within the transaction that wrote them
+
+        NOTE: the cached set is only updated once the write is committed, see `commit`
+        """
+        # serialize concurrent updates (of any process) and merge with the committed ranges
+        await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1 || '/' || $2))", symbol, frequency)
+        rows = await conn.fetch("""
+                SELECT start, stop FROM ohlc_coverage
+                WHERE symbol = $1 AND frequency = $2
+            """, symbol, frequency)
+        merged = IntervalSet([(row["start"], row["stop"]) for row in rows] + list(intervals))
+        await conn.execute("""
+                DELETE FROM ohlc_coverage WHERE symbol = $1 AND frequency = $2
+            """, symbol, frequency)
+        await conn.executemany("""
+                INSERT INTO ohlc_coverage (symbol, frequency, start, stop) VALUES ($1, $2, $3, $4)
+            """, [(symbol, frequency, start, stop) for start, stop in merged])
+        return merged
+
+    def commit(self, symbol: str, frequency: str, merged: IntervalSet):
+        """Merge the coverage returned by `add` into the cache once its transaction is committed"""
+        cached = self.index.setdefault((symbol, frequency), IntervalSet())
+        for start, stop in merged:
+            cached.add(start, stop)
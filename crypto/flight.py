@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: history scans in flight, shared by the requests they can answer
+
+"""
+import asyncio
+from datetime import datetime
+from typing import List
+
+from utils.columnar import COLUMNS
+
+
+class Subscriber:
+    """A request answered by a flight, with its own range and reply stream"""
+
+    __slots__ = ("data", "start", "stop", "seq", "chunk", "done")
+
+    def __init__(self, data: dict, start: datetime, stop: datetime):
+        self.data = data
+        self.start, self.stop = start, stop
+        # next sequence number and columns of the candles not yet published
+        self.seq, self.chunk = 0, {column: [] for column in COLUMNS}
+        # resolved once the reply stream has ended
+        self.done = asyncio.get_event_loop().create_future()
+
+
+class Flight:
+    """A single DB scan and API backfill of `[start, stop)` for one symbol/frequency"""
+
+    def __init__(self, start: datetime, stop: datetime):
+        self.start, self.stop = start, stop
+        self.subscribers: List[Subscriber] = []
+        # time of the last candle handed to the subscribers
+        self.sent = None
+        self.closed = False
+
+    def accepts(self, start: datetime, stop: datetime) -> bool:
+        """Whether a request for `[start, stop)` can still get all of its candles from this flight"""
+        return (
+            not self.closed
+            and self.start <= start
+            and stop <= self.stop
+            and (self.sent is None or start > self.sent)
+        )
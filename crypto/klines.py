@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: paginated binance klines client with request weight limiting
+
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import AsyncIterator, List, Tuple
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+from crypto.candles import longest_seconds
+
+
+def kline_weight(limit: int) -> int:
+    """Request weight of a klines call returning up to `limit` candles"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class KlineClient:
+    """Fetch klines in pages over one pooled session, within the request weight limit"""
+
+    def __init__(self, limit: int = 1000, concurrency: int = 4, weight_limit: int = 1200,
+                 max_retries: int = 5, max_backoff: float = 60., timeout: float = 30.):
+        """Initialize the client, the session is opened on first use
+
+        :Params:
+            - limit: candles per page (max 1000 on spot, 1500 on futures)
+            - concurrency: max number of pages requested at once
+            - weight_limit: request weight allowed per minute
+            - max_retries: attempts per page before giving up
+            - max_backoff: upper bound (s) of the exponential retry delay
+            - timeout: max time (s) of a single request
+        """
+        self.KLINES_URI = os.getenv("BINANCE_KLINES_URI", "https://api.binance.com/api/v3/klines")
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.weight_limit = weight_limit
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.timeout = ClientTimeout(total=timeout)
+        self.session = None
+        # weight used in the current minute, as reserved locally or reported by the server
+        self.window, self.used_weight = None, 0
+
+    def pages(self, frequency: str, start: int, stop: int) -> List[Tuple[int, int]]:
+        """`(startTime, endTime)` of the pages covering `[start, stop)` (epoch ms)
+
+        NOTE: `endTime` is inclusive, so pages stop a millisecond short of the next one,
+        pages of monthly klines may hold fewer than `limit`
+        """
+        step = self.limit * longest_seconds(frequency) * 1000
+        return [(page, min(page + step, stop) - 1) for page in range(start, stop, step)]
+
+    async def fetch(self, symbol: str, frequency: str, start: int, stop: int) -> AsyncIterator[List[list]]:
+        """Yield the klines of `[start, stop)` (epoch ms) page by page, as they arrive"""
+        if self.session is None:
+            self.session = ClientSession(timeout=self.timeout)
+        requests = [
+            asyncio.ensure_future(self.page({
+                "symbol": symbol.upper(), "interval": frequency, "limit": self.limit,
+                "startTime": page_start, "endTime": page_stop,
+            }))
+            for page_start, page_stop in self.pages(frequency, start, stop)
+        ]
+        try:
+            for request in asyncio.as_completed(requests):
+                yield await request
+        finally:
+            for request in requests:
+                request.cancel()
+
+    async def page(self, params: dict) -> List[list]:
+        """Request a single page, retrying rate limits, server and network errors"""
+        backoff = 1.
+        for attempt in range(1, self.max_retries + 1):
+            async with self.semaphore:
+                await self.reserve(kline_weight(self.limit))
+                try:
+                    async with self.session.get(self.KLINES_URI, params=params) as response:
+                        self.observe(response.headers)
+                        if response.status in (418, 429):
+                            # NOTE: 429 is a rate limit, 418 an IP ban for ignoring them
+                            delay = float(response.headers.get("Retry-After", backoff))
+                            sys.stderr.write(f"[warn] KlineClient: {response.status}, retrying in {delay}s\n")
+                        elif response.status >= 500:
+                            delay = backoff
+                            sys.stderr.write(f"[warn] KlineClient: {response.status}, retrying in {delay}s\n")
+                        else:
+                            response.raise_for_status()
+                            return await response.json()
+                except (ClientError, asyncio.TimeoutError) as e:
+                    if getattr(e, "status", 500) < 500:
+                        raise
+                    delay = backoff
+                    sys.stderr.write(f"[error] KlineClient: {e!r}, retrying in {delay}s\n")
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+        raise RuntimeError(f"KlineClient: gave up on {params} after {self.max_retries} attempts")
+
+    async def reserve(self, weight: int):
+        """Wait until `weight` fits in the current minute and account for it"""
+        while True:
+            window = int(time.time() // 60)
+            if window != self.window:
+                self.window, self.used_weight = window, 0
+            if self.used_weight + weight <= self.weight_limit:
+                self.used_weight += weight
+                return
+            await asyncio.sleep(60 - time.time() % 60)
+
+    def observe(self, headers):
+        """Adopt the weight reported by the server if it is ahead of the local count"""
+        used = headers.get("X-MBX-USED-WEIGHT-1M", headers.get("X-MBX-USED-WEIGHT"))
+        if used is not None and int(time.time() // 60) == self.window:
+            self.used_weight = max(self.used_weight, int(used))
+
+    async def close(self):
+        """Close the pooled session"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
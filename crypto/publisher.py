@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: bounded, micro-batched publishing to rabbitmq with publisher confirms
+
+"""
+import asyncio
+from asyncio import Queue, QueueEmpty, QueueFull
+from collections import deque
+import sys
+import time
+
+from aio_pika import Exchange, Message, DeliveryMode
+
+from crypto.recorder import Recorder
+
+
+class Publisher:
+    """Publish messages on an exchange in confirmed batches from a bounded queue"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, exchange: Exchange, max_queue: int = 10000,
+                 batch_size: int = 500, batch_ms: float = 50., stats_interval: float = 0.,
+                 recorder: Recorder = None):
+        """Initialize the outbound queue
+
+        :Params:
+            - exchange: exchange to publish on (its channel should have publisher confirms on)
+            - max_queue: max number of queued messages, transient messages are dropped beyond it
+            - batch_size: max number of messages published (and confirmed) together
+            - batch_ms: max time (ms) to wait for a batch to fill up
+            - stats_interval: interval (s) to print the counters at, 0 to disable
+            - recorder: optional recorder every accepted message is appended to
+        """
+        self.loop = loop
+        self.exchange = exchange
+        self.batch_size = batch_size
+        self.batch_window = batch_ms / 1000
+        self.stats_interval = stats_interval
+        self.recorder = recorder
+
+        self.queue = Queue(maxsize=max_queue)
+        # persistent messages are never dropped, they wait here if the queue is full
+        self.backlog = deque()
+
+        self.published, self.dropped, self.failed, self.in_flight = 0, 0, 0, 0
+        self.filling = False
+        self.tasks = []
+
+    @property
+    def queued(self) -> int:
+        """Number of messages waiting to be published"""
+        return self.queue.qsize() + len(self.backlog)
+
+    def stats(self) -> dict:
+        """Counters to size the queue and batches under load"""
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "published": self.published,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def put(self, body: bytes, routing_key: str, persistent: bool = True) -> bool:
+        """Queue a message without blocking, return whether it was accepted"""
+        # NOTE: nothing overtakes the backlog, messages of a routing key are published in the order they are put
+        try:
+            if self.backlog:
+                raise QueueFull
+            self.queue.put_nowait((body, routing_key, persistent))
+        except QueueFull:
+            if not persistent:
+                self.dropped += 1
+                return False
+            self.backlog.append((body, routing_key, persistent))
+        if self.recorder is not None:
+            self.recorder.write(time.time(), body.decode(), routing_key)
+        return True
+
+    def start(self):
+        """Start the publishing (and reporting) tasks"""
+        self.tasks.append(self.loop.create_task(self.run()))
+        if self.stats_interval:
+            self.tasks.append(self.loop.create_task(self.report()))
+
+    async def run(self):
+        """Collect messages into batches and publish them"""
+        while True:
+            batch = [await self.queue.get()]
+            self.filling = True
+            batch = await self.fill(batch)
+            self.filling = False
+            await self.flush(batch)
+
+    async def fill(self, batch: list) -> list:
+        """Add queued messages to `batch` until it is full or the batch window closes"""
+        deadline = self.loop.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except QueueEmpty:
+                pass
+            timeout = deadline - self.loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # refill the queue from the backlog now that there is room
+        while self.backlog and not self.queue.full():
+            self.queue.put_nowait(self.backlog.popleft())
+        return batch
+
+    async def flush(self, batch: list):
+        """Publish a batch and wait for the broker to confirm it
+
+        NOTE: messages are ordered per routing key (consumers only see the
+        topics they are bound to), each key is published in order while
+        the keys of a batch are published concurrently
+        """
+        self.in_flight += len(batch)
+        topics = {}
+        for body, routing_key, persistent in batch:
+            topics.setdefault(routing_key, []).append((body, persistent))
+        results = [
+            result for results in await asyncio.gather(*(
+                self.publish(routing_key, messages) for routing_key, messages in topics.items()
+            )) for result in results
+        ]
+        self.in_flight -= len(batch)
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        self.failed += len(errors)
+        self.published += len(batch) - len(errors)
+        if errors:
+            sys.stderr.write(f"[error] Publisher: {len(errors)}/{len(batch)} not confirmed: {errors[0]!r}\n")
+
+    async def publish(self, routing_key: str, messages: list) -> list:
+        """Publish the messages of a routing key one after the other, their results or errors"""
+        results = []
+        for body, persistent in messages:
+            try:
+                results.append(await self.exchange.publish(Message(
+                    body,
+                    delivery_mode=DeliveryMode.PERSISTENT if persistent else DeliveryMode.NOT_PERSISTENT
+                ), routing_key=routing_key))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def report(self):
+        """Print the counters periodically"""
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            print("[publisher]", " ".join(f"{k}={v}" for k, v in self.stats().items()))
+
+    async def close(self):
+        """Wait for the queued messages to be published and stop"""
+        while self.tasks and (self.queued or self.in_flight or self.filling):
+            await asyncio.sleep(self.batch_window)
+        [task.cancel() for task in self.tasks]
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: compressed, append-only recording of stream frames for replays
+
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import sys
+import time
+from typing import Iterator, Tuple
+
+
+class Recorder:
+    """Append frames with their receive timestamps to a gzip recording
+
+    Every flush appends a self-contained gzip member of tab separated
+    `received, topic, frame` lines, so the file is only ever appended to and a
+    crash loses at most the unflushed frames. `topic` is empty for raw
+    websocket frames and holds the routing key for published messages.
+    Members are compressed and appended by a single background thread, in
+    order, so the event loop never blocks on the file.
+    """
+
+    def __init__(self, path: str, flush_size: int = 1000, flush_interval: float = 5.):
+        """Initialize the recording buffer
+
+        :Params:
+            - path: recording file, created if missing and appended to otherwise
+            - flush_size: number of buffered frames that triggers a flush
+            - flush_interval: max time (s) a frame stays buffered (checked on write)
+        """
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def write(self, received: float, frame: str, topic: str = ""):
+        """Buffer a frame, flushing the buffer if it is due"""
+        self.buffer.append(f"{received:.6f}\t{topic}\t{frame}\n")
+        if len(self.buffer) >= self.flush_size or \
+                time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered frames as a new gzip member, off the event loop if running"""
+        if self.buffer:
+            lines, self.buffer = "".join(self.buffer), []
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.append(lines)
+            else:
+                loop.run_in_executor(self.executor, self.append, lines).add_done_callback(self.appended)
+        self.last_flush = time.monotonic()
+
+    def append(self, lines: str):
+        """Compress and append lines to the recording (blocking)"""
+        with open(self.path, "ab") as f:
+            f.write(gzip.compress(lines.encode()))
+
+    def appended(self, future: asyncio.Future):
+        """Report a failed append"""
+        if not future.cancelled() and future.exception() is not None:
+            sys.stderr.write(f"[error] Recorder: append to {self.path} failed: {future.exception()!r}\n")
+
+    def close(self):
+        """Flush the remaining frames and wait for them to be written"""
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, str, str]]:
+    """Iterate over the `(received, topic, frame)` records of a recording"""
+    with gzip.open(path, "rt") as f:
+        try:
+            for line in f:
+                received, topic, frame = line.rstrip("\n").split("\t", 2)
+                yield float(received), topic, frame
+        except EOFError:
+            # the last member was cut short (crash while flushing)
+            return
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: local disk spool for batches that could not be written to the database
+
+"""
+import glob
+import os
+import pickle
+import time
+from typing import Iterator, List, Tuple
+
+
+class Spool:
+    """Segmented, append-only files of `(table, rows)` batches
+
+    Batches are appended to the current segment, which is rolled over once it
+    grows past `segment_bytes`. Segments are replayed oldest first and deleted
+    once every batch they hold has been written.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024):
+        """Initialize the spool directory
+
+        :Params:
+            - directory: directory holding the segments (created if missing)
+            - segment_bytes: size after which a new segment is started
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.current = None
+
+    def write(self, table: str, rows: list):
+        """Durably append a batch to the current segment"""
+        if self.current is None:
+            self.current = open(os.path.join(self.directory, f"{time.time_ns():020d}.spool"), "ab")
+        pickle.dump((table, rows), self.current, protocol=pickle.HIGHEST_PROTOCOL)
+        self.current.flush()
+        os.fsync(self.current.fileno())
+        if self.current.tell() >= self.segment_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Close the current segment so it can be replayed"""
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+    def pending(self) -> bool:
+        """Whether any batch is waiting to be replayed"""
+        return self.current is not None or bool(self.segments())
+
+    def segments(self) -> List[str]:
+        """Closed segments, oldest first"""
+        segments = sorted(glob.glob(os.path.join(self.directory, "*.spool")))
+        if self.current is not None:
+            segments.remove(self.current.name)
+        return segments
+
+    @staticmethod
+    def read(segment: str) -> Iterator[Tuple[str, list]]:
+        """Iterate over the batches of a segment"""
+        with open(segment, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+                except pickle.UnpicklingError:
+                    # the last batch was cut short (crash while writing)
+                    return
+
+    @staticmethod
+    def remove(segment: str):
+        """Delete a fully replayed segment"""
+        os.remove(segment)
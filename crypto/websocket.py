@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: asyncio websocket client for binance combined streams
+
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Callable, List
+
+from aiohttp import ClientError, ClientSession, WSMsgType
+
+from crypto.recorder import Recorder
+
+
+class WebSocketClient:
+    """Combined stream connection with keepalive and automatic reconnects"""
+
+    def __init__(self, streams: List[str], callback: Callable[[dict, float], None],
+                 session: ClientSession, heartbeat: float = 20., timeout: float = 60.,
+                 max_backoff: float = 60., recorder: Recorder = None):
+        """Initialize the connection for a set of streams
+
+        :Params:
+            - streams: combined stream names, eg: ["btcusdt@markPrice@1s", "btcusdt@bookTicker"]
+            - callback: called with every decoded message and its receive timestamp (epoch seconds)
+            - session: aiohttp session shared across connections
+            - heartbeat: interval (s) between pings, the connection is dropped if no pong arrives
+            - timeout: max time (s) to wait for a message before reconnecting
+            - max_backoff: upper bound (s) of the exponential reconnect delay
+            - recorder: optional recorder the raw frames are appended to
+        """
+        self.WS_URI = os.getenv("BINANCE_WS_URI", "wss://fstream.binance.com/stream")
+        self.url = f"{self.WS_URI}?streams={'/'.join(streams)}"
+        self.callback = callback
+        self.session = session
+        self.heartbeat = heartbeat
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.recorder = recorder
+        self.running = False
+        self.ws = None
+        self.receiver = None
+
+    async def run(self):
+        """Connect and dispatch messages until closed, reconnecting on failure"""
+        self.running, backoff = True, 1.
+        while self.running:
+            try:
+                async with self.session.ws_connect(self.url, heartbeat=self.heartbeat,
+                                                   receive_timeout=self.timeout) as self.ws:
+                    backoff = 1.
+                    # NOTE: received in a task of its own, cancelled by `close`
+                    self.receiver = asyncio.ensure_future(self.receive())
+                    try:
+                        await asyncio.wait({self.receiver})
+                    finally:
+                        self.receiver.cancel()
+                    if not self.receiver.cancelled():
+                        self.receiver.result()
+            except (ClientError, asyncio.TimeoutError) as e:
+                sys.stderr.write(f"[error] WebSocket: {e!r}\n")
+            if self.running:
+                sys.stderr.write(f"[warn] WebSocket: reconnecting in {backoff}s\n")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def receive(self):
+        """Dispatch the messages of the current connection until it closes"""
+        async for msg in self.ws:
+            received = time.time()
+            if msg.type == WSMsgType.TEXT:
+                if self.recorder is not None:
+                    self.recorder.write(received, msg.data)
+                self.dispatch(msg.data, received)
+            elif msg.type == WSMsgType.ERROR:
+                break
+
+    def dispatch(self, frame: str, received: float):
+        """Decode a frame and hand it to the callback"""
+        try:
+            self.callback(json.loads(frame), received)
+        except Exception as e:
+            sys.stderr.write(f"[error] WebSocket: callback failed on {frame!r}: {e!r}\n")
+
+    async def close(self):
+        """Stop reconnecting and close the current connection"""
+        self.running = False
+        if self.receiver is not None:
+            self.receiver.cancel()
+        if self.ws is not None:
+            await self.ws.close()
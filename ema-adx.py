@@ -8,6 +8,8 @@ import asyncio
 import sys
 
 from utils.config_parser import collect_configs
+from utils.enums import Stage
+from utils.optimize import optimize
 from utils.strategy_helpers import Strategy
 
 
@@ -27,5 +29,8 @@ async def main():
 
 if __name__ == "__main__":
     sections, args = collect_configs()
+    if args.stage == Stage.OPTIMIZE:
+        optimize(sections)
+        sys.exit(0)
     loop.create_task(main())
     loop.run_forever()
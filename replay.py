@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: replay a stream recording through the ingest pipeline
+    :usage: $ ./replay.py -i data/frames.rec.gz --speed 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from crypto.recorder import read_recording
+from crypto.stream import Stream
+
+
+def collect_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--input", type=str, required=True,
+                        help="recording (STREAM_RECORD_PATH or PUBLISH_RECORD_PATH output)")
+    parser.add_argument("-s", "--speed", type=float, default=1.,
+                        help="replay speed, 1 for realtime, N for N times faster, 0 for max speed")
+    parser.add_argument("-a", "--assets", type=str, default=os.getenv("STREAM_ASSETS", "btc/usdt"),
+                        help="assets of the recording, eg: btc/usdt,eth/usdt")
+    args = parser.parse_args()
+    return args
+
+
+async def replay(loop: asyncio.AbstractEventLoop, args: argparse.Namespace):
+    """Feed the recording to the stream (raw frames) or the exchange (published messages)"""
+    assets = [tuple(asset.split("/")) for asset in args.assets.split(",")]
+    stream = Stream(loop, assets)
+    await stream.setup()
+    publisher = stream.publisher
+
+    frames, lag, started, first = 0, 0., time.monotonic(), None
+    for received, topic, frame in read_recording(args.input):
+        if first is None:
+            first = received
+        if args.speed:
+            delay = (received - first) / args.speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+        elif frames % 1000 == 0:
+            await asyncio.sleep(0)
+
+        # apply backpressure instead of dropping while replaying
+        while publisher.queue.full():
+            await asyncio.sleep(publisher.batch_window)
+
+        if topic:
+            publisher.put(frame.encode(), topic, stream.persistent_ticks or ".tick." not in topic)
+        else:
+            stream.stream_callback(json.loads(frame), received)
+        frames += 1
+
+    await publisher.close()
+    elapsed = time.monotonic() - started
+    await stream.connection.close()
+
+    print(f"replayed {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.0f} frames/s)")
+    if args.speed:
+        print(f"max lag behind schedule: {lag * 1000:.1f}ms")
+    print("[publisher]", " ".join(f"{k}={v}" for k, v in publisher.stats().items()))
+
+
+def main():
+    args = collect_args()
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(replay(loop, args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
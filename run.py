@@ -19,7 +19,10 @@ def start_stream():
         loop = asyncio.get_event_loop()
         API_KEY = os.getenv("BINANCE_API_KEY", "change-this-key")
         API_SECRET = os.getenv("BINANCE_API_SECRET", "change-this-secret")
-        stream = Stream(loop, ("btc", "usdt"), API_KEY, API_SECRET)
+        ASSETS = os.getenv("STREAM_ASSETS", "btc/usdt")
+        SHARD_SIZE = int(os.getenv("STREAM_SHARD_SIZE", 10))
+        assets = [tuple(asset.split("/")) for asset in ASSETS.split(",")]
+        stream = Stream(loop, assets, API_KEY, API_SECRET, SHARD_SIZE)
         loop.create_task(stream.run())
         loop.run_forever()
     except BinanceAPIException as e:
@@ -32,9 +35,14 @@ def start_warehouse():
     policy.set_event_loop(policy.new_event_loop())
     try:
         loop = asyncio.get_event_loop()
-        warehouse = Warehouse(loop)
+        ACK_MODE = os.getenv("WAREHOUSE_ACK_MODE", "receive")
+        SPOOL_DIR = os.getenv("WAREHOUSE_SPOOL_DIR")
+        warehouse = Warehouse(loop, ack_mode=ACK_MODE, spool_dir=SPOOL_DIR)
         loop.create_task(warehouse.run())
         loop.run_forever()
+    except KeyboardInterrupt:
+        # write out whatever is still buffered
+        loop.run_until_complete(warehouse.close())
     except Exception as e:
         sys.stderr.write(f"[error] Warehouse: {e}\n")
 
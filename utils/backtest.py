@@ -5,12 +5,27 @@
     :brief: BTC futures strategy
 """
 import argparse
-from datetime import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
+import itertools
+import os
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import talib
 
+try:
+    from utils.indicator_cache import IndicatorCache
+    from utils.shm import Spec, attach, share
+    from utils.ticks import resolve_exits
+except ModuleNotFoundError:
+    # run as a script (`./backtest.py`), next to its siblings
+    from indicator_cache import IndicatorCache
+    from shm import Spec, attach, share
+    from ticks import resolve_exits
+
 
 class Signal(Enum):
     """Signal generated"""
@@ -43,20 +58,52 @@ def collect_args() -> argparse.Namespace:
                         default=10, help="EMA Fast")
     parser.add_argument("-a", "--adx", type=int,
                         default=14, help="ADX period")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Directory of the indicator cache shared by the runs")
+    parser.add_argument("-e", "--engine", type=str, default="vector", choices=ENGINES,
+                        help="Backtest engine (candle `loop` or `vector`ized)")
+    parser.add_argument("--ticks", action="store_true",
+                        help="Resolve exits on candles touching both TP and SL from the ticks stored in DATABASE_URI")
+    parser.add_argument("--asset", type=str, default="btcusdt",
+                        help="Symbol of the ticks")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes backtesting time chunks in parallel")
 
     args = parser.parse_args()
     return args
 
 
-def main():
-    args = collect_args()
-    df = pd.read_csv(args.input, parse_dates=[0])
+def add_indicators(df: pd.DataFrame, ema_fast: int, ema_slow: int, adx: int,
+                   cache: IndicatorCache = None, fingerprint: str = None) -> pd.DataFrame:
+    """Add the EMA fast/slow and ADX columns used by the entry signals
+
+    :Params:
+        - cache: indicator series shared by the backtests, computed here if not given
+        - fingerprint: `IndicatorCache.fingerprint` of the OHLC data, computed if not given
+    """
+    if cache is None:
+        df['emaFast'] = talib.EMA(df.Close, timeperiod=ema_fast)
+        df['emaSlow'] = talib.EMA(df.Close, timeperiod=ema_slow)
+        df['adx'] = talib.ADX(df.High, df.Low,
+                              df.Close, timeperiod=adx)
+        return df
+
+    fingerprint = fingerprint or cache.fingerprint(df.High, df.Low, df.Close)
+    high, low, close = (df[column].to_numpy() for column in ('High', 'Low', 'Close'))
+    df['emaFast'] = cache.series(fingerprint, "EMA", close, timeperiod=ema_fast)
+    df['emaSlow'] = cache.series(fingerprint, "EMA", close, timeperiod=ema_slow)
+    df['adx'] = cache.series(fingerprint, "ADX", high, low, close, timeperiod=adx)
+    return df
 
-    df['emaFast'] = talib.EMA(df.Close, timeperiod=args.ema_fast)
-    df['emaSlow'] = talib.EMA(df.Close, timeperiod=args.ema_slow)
-    df['adx'] = talib.ADX(df.High, df.Low,
-                          df.Close, timeperiod=args.adx)
 
+def loop_engine(df: pd.DataFrame, sl_points: float, rr: float) -> List[dict]:
+    """Run the strategy candle by candle
+
+    :Params:
+        - df: OHLCV data along with the indicator columns
+        - sl_points: stoploss distance
+        - rr: risk reward ratio 1:X
+    """
     signal, status, inPosition, exited = Signal.NULL, None, False, False
     sl, tp, buyPrice, win, loss = 0, 0, 0, 0, 0
     orders = []
@@ -84,11 +131,11 @@ def main():
             inPosition = True
             orderTime = df.at[i, 'Timestamp']
             if signal == Signal.LONG:
-                tp = buyPrice + (args.sl * args.rr)
-                sl = buyPrice - args.sl
+                tp = buyPrice + (sl_points * rr)
+                sl = buyPrice - sl_points
             elif signal == Signal.SHORT:
-                tp = buyPrice - (args.sl * args.rr)
-                sl = buyPrice + args.sl
+                tp = buyPrice - (sl_points * rr)
+                sl = buyPrice + sl_points
 
         # wait for exit condition
         else:
@@ -123,9 +170,217 @@ def main():
                 signal, status, inPosition, exited = Signal.NULL, None, False, False
                 sl, tp, buyPrice = 0, 0, 0
 
+    print()
+    return orders
+
+
+def entry_signals(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Candles generating a LONG and a SHORT signal (EMA cross with 30 < ADX < 40)"""
+    fast, slow, adx = (df[column].to_numpy(dtype=float) for column in ('emaFast', 'emaSlow', 'adx'))
+    prev_fast, prev_slow = np.r_[np.nan, fast[:-1]], np.r_[np.nan, slow[:-1]]
+    trending = (adx < 40) & (adx > 30)
+    short = (fast > slow) & (prev_fast < prev_slow) & trending
+    long = (fast < slow) & (prev_fast > prev_slow) & trending
+    return long, short
+
+
+def find_exit(high: np.ndarray, low: np.ndarray, start: int, signal: Signal,
+              tp: float, sl: float) -> Tuple[Optional[int], Optional[Status]]:
+    """First candle from `start` reaching the TP (checked first) or the SL, (None, None) if none
+
+    The candles are searched in blocks doubling in size, so short trades only
+    look at a few candles and long ones cost a handful of array operations.
+    """
+    size = 64
+    while start < len(high):
+        stop = min(start + size, len(high))
+        if signal == Signal.LONG:
+            wins, losses = tp <= high[start:stop], sl >= low[start:stop]
+        else:
+            wins, losses = tp >= low[start:stop], sl <= high[start:stop]
+        exits = wins | losses
+        if exits.any():
+            k = int(exits.argmax())
+            return start + k, Status.WIN if wins[k] else Status.LOSS
+        start, size = stop, size * 2
+    return None, None
+
+
+# signal candle, exit candle (None if never exited), side, result and entry price of a trade
+Trade = Tuple[int, Optional[int], Signal, Optional[Status], float]
+
+
+def trades(signals: np.ndarray, shorts: np.ndarray, opens: np.ndarray, high: np.ndarray,
+           low: np.ndarray, close: np.ndarray, sl_points: float, rr: float, start: int = 0) -> Iterator[Trade]:
+    """Trades taken on `signals` (sorted candle indices) when scanning from candle `start`
+
+    A signal enters on the next candle, exits are searched from the candle
+    after the entry and signals are scanned again from the candle after the
+    exit. The last trade is yielded without an exit if it is still open.
+
+    :Params:
+        - signals: candles generating a signal
+        - shorts: whether each signal is a SHORT one
+        - opens, high, low, close: OHLC arrays the indices refer to
+        - sl_points: stoploss distance
+        - rr: risk reward ratio 1:X
+    """
+    i = start
+    while (j := np.searchsorted(signals, i)) < len(signals):
+        entry = signals[j] + 1
+        if entry >= len(close):
+            return
+        signal = Signal.SHORT if shorts[j] else Signal.LONG
+        buyPrice = (close[entry] + opens[entry]) / 2
+        if signal == Signal.LONG:
+            tp, sl = buyPrice + (sl_points * rr), buyPrice - sl_points
+        else:
+            tp, sl = buyPrice - (sl_points * rr), buyPrice + sl_points
+
+        k, status = find_exit(high, low, entry + 1, signal, tp, sl)
+        yield int(signals[j]), k, signal, status, buyPrice
+        if k is None:
+            return
+        i = k + 1
+
+
+def trade_orders(df: pd.DataFrame, chain: Iterable[Trade]) -> List[dict]:
+    """Orders of the exited trades of a chain"""
+    timestamps, high, low = df.Timestamp, df.High.to_numpy(), df.Low.to_numpy()
+    return [{
+        'entry_time': timestamps.iat[signal + 1],
+        'exit_time': timestamps.iat[k],
+        'trade_type': side.name,
+        'exit_high': high[k],
+        'exit_low': low[k],
+        'entry_price': buyPrice,
+        'status': status.value
+    } for signal, k, side, status, buyPrice in chain if k is not None]
+
+
+def vector_engine(df: pd.DataFrame, sl_points: float, rr: float) -> List[dict]:
+    """Run the strategy trade by trade over the signal and High/Low arrays
+
+    Produces the same orders as `loop_engine`, see `trades`.
+
+    :Params:
+        - df: OHLCV data along with the indicator columns
+        - sl_points: stoploss distance
+        - rr: risk reward ratio 1:X
+    """
+    long, short = entry_signals(df)
+    signals = np.flatnonzero(long | short)
+    ohlc = (df[column].to_numpy() for column in ('Open', 'High', 'Low', 'Close'))
+    return trade_orders(df, trades(signals, short[signals], *ohlc, sl_points, rr))
+
+
+ENGINES = {
+    "loop": loop_engine,
+    "vector": vector_engine,
+}
+
+# shared memory block and OHLC arrays of a chunk worker process
+_block, _ohlc = None, None
+
+
+def init_chunk_worker(spec: Spec) -> None:
+    """Attach a chunk worker process to the shared OHLC data"""
+    global _block, _ohlc
+    _block, columns = attach(spec)
+    _ohlc = tuple(columns[column] for column in ('Open', 'High', 'Low', 'Close'))
+
+
+def backtest_chunk(start: int, stop: int, warmup: int, ema_fast: int, ema_slow: int, adx: int,
+                   sl_points: float, rr: float) -> Tuple[np.ndarray, np.ndarray, List[Trade]]:
+    """Signals of the candles `[start, stop)` and the trades taken on them when flat at `start`
+
+    The indicators are computed from `warmup` candles before `start`, exits
+    are searched past `stop` if need be.
+    """
+    first = max(0, start - warmup)
+    df = pd.DataFrame({column: values[first:stop] for column, values in zip(('Open', 'High', 'Low', 'Close'), _ohlc)})
+    long, short = entry_signals(add_indicators(df, ema_fast, ema_slow, adx))
+    signals = np.flatnonzero((long | short)[start - first:])
+    shorts = short[start - first:][signals]
+    signals += start
+    return signals, shorts, list(trades(signals, shorts, *_ohlc, sl_points, rr, start))
+
+
+def parallel_engine(df: pd.DataFrame, ema_fast: int, ema_slow: int, adx: int, sl_points: float, rr: float,
+                    workers: int, chunks: int = None, warmup: int = 40) -> List[dict]:
+    """Run the strategy on time chunks across a process pool, stitched into the orders of a serial run
+
+    Each chunk computes its indicators from a warm-up window of `warmup` times
+    the longest period before its first candle, and takes its trades as if
+    flat at its start. Chunks are then chained in order: a chunk whose start
+    is inside a trade of the previous ones is replayed from the candle after
+    that trade's exit, until one of its trades matches its own chain.
+
+    :Params:
+        - df: OHLCV data
+        - ema_fast, ema_slow, adx: indicator periods
+        - sl_points: stoploss distance
+        - rr: risk reward ratio 1:X
+        - workers: number of worker processes
+        - chunks: number of chunks, 4 per worker if not given
+        - warmup: warm-up window, in multiples of the longest indicator period
+    """
+    chunks = chunks or workers * 4
+    bounds = np.linspace(0, len(df), chunks + 1).astype(int)
+    warmup *= max(ema_fast, ema_slow, adx)
+    ohlc = {column: df[column].to_numpy(dtype=float) for column in ('Open', 'High', 'Low', 'Close')}
+    block, spec = share(ohlc)
+    try:
+        with ProcessPoolExecutor(workers, initializer=init_chunk_worker, initargs=(spec,)) as pool:
+            results = list(pool.map(
+                backtest_chunk, bounds[:-1], bounds[1:], *(itertools.repeat(value) for value in (
+                    warmup, ema_fast, ema_slow, adx, sl_points, rr))))
+    finally:
+        block.close()
+        block.unlink()
+
+    chain, resume = [], 0
+    for start, (signals, shorts, chunk_chain) in zip(bounds[:-1], results):
+        if resume > start:
+            # NOTE: the chunk starts inside a trade, replay it until it syncs up with its chain
+            synced = {trade[0]: i for i, trade in enumerate(chunk_chain)}
+            replayed = []
+            for trade in trades(signals, shorts, *ohlc.values(), sl_points, rr, resume):
+                if trade[0] in synced:
+                    replayed.extend(chunk_chain[synced[trade[0]]:])
+                    break
+                replayed.append(trade)
+            chunk_chain = replayed
+        chain.extend(chunk_chain)
+        if chain and chain[-1][1] is None:
+            # a trade never exited, no later trade is taken
+            break
+        if chunk_chain:
+            resume = chunk_chain[-1][1] + 1
+    return trade_orders(df, chain)
+
+
+def main():
+    args = collect_args()
+    df = pd.read_csv(args.input, parse_dates=[0])
+    if args.workers > 1:
+        orders = parallel_engine(df, args.ema_fast, args.ema_slow, args.adx, args.sl, args.rr, args.workers)
+    else:
+        cache = IndicatorCache(directory=args.cache) if args.cache else None
+        add_indicators(df, args.ema_fast, args.ema_slow, args.adx, cache)
+        orders = ENGINES[args.engine](df, args.sl, args.rr)
+
+    if args.ticks:
+        stats = asyncio.run(resolve_exits(
+            orders, os.getenv("DATABASE_URI", "postgresql://postgres@localhost/test"), args.asset,
+            df.Timestamp.diff().median().to_pytimedelta(), args.sl, args.rr))
+        print("Ticks | " + " ".join(f"{k}={v}" for k, v in stats.items()))
+
+    win = sum(order['status'] == Status.WIN.value for order in orders)
+    loss = len(orders) - win
     total = win + loss
     print(
-        f"\nT: {total} :: W: {win} | L: {loss} [{round(win / total * 100, 2)}%]")
+        f"T: {total} :: W: {win} | L: {loss} [{round(win / total * 100, 2)}%]")
     orders = pd.DataFrame(orders)
     orders.to_csv(args.output, index=False, float_format="%.3f")
 
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: benchmark the backtest engines (candle loop vs vectorized vs chunked parallel)
+    :usage: $ python -m utils.bench_backtest -n 100000 -w 2 4
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.backtest import ENGINES, add_indicators, parallel_engine
+
+
+def collect_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--input", type=str, default=None,
+                        help="OHLCV Data, a random walk of `--candles` 1m candles if not given")
+    parser.add_argument("-n", "--candles", type=int, default=100000,
+                        help="number of random walk candles")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random walk")
+    parser.add_argument("--sl", type=int, default=100,
+                        help="Stoploss")
+    parser.add_argument("--rr", type=float, default=1.5,
+                        help="Risk reward ratio 1:X")
+    parser.add_argument("-w", "--workers", type=int, nargs="*", default=[],
+                        help="numbers of processes of the chunked parallel runs to time")
+    parser.add_argument("--skip-loop", action="store_true",
+                        help="skip the (slow) candle loop engine")
+    args = parser.parse_args()
+    return args
+
+
+def random_walk(n: int, seed: int = 0) -> pd.DataFrame:
+    """1m BTC-like OHLCV candles"""
+    rng = np.random.default_rng(seed)
+    close = 30000 + np.cumsum(rng.normal(0, 20, n))
+    opens = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 10, (2, n)))
+    return pd.DataFrame({
+        "Timestamp": pd.date_range("2021-01-01", periods=n, freq="1min"),
+        "Open": opens,
+        "High": np.maximum(opens, close) + spread[0],
+        "Low": np.minimum(opens, close) - spread[1],
+        "Close": close,
+        "Volume": rng.uniform(1, 100, n),
+    })
+
+
+def main(args: argparse.Namespace):
+    df = pd.read_csv(args.input, parse_dates=[0]) if args.input else random_walk(args.candles, args.seed)
+
+    def serial(engine):
+        return lambda: engine(add_indicators(df.copy(), 10, 25, 14), args.sl, args.rr)
+
+    engines = {name: serial(engine) for name, engine in ENGINES.items() if name != "loop" or not args.skip_loop}
+    for workers in args.workers:
+        engines[f"{workers} proc"] = lambda workers=workers: parallel_engine(df, 10, 25, 14, args.sl, args.rr, workers)
+
+    results = {}
+    for name, engine in engines.items():
+        wall = time.perf_counter()
+        # NOTE: the loop engine prints its progress on every candle
+        with contextlib.redirect_stdout(io.StringIO()):
+            orders = engine()
+        wall = time.perf_counter() - wall
+        results[name] = pd.DataFrame(orders).to_csv(index=False, float_format="%.3f")
+        print(f"{name:>8} | {len(df) / wall:>12,.0f} candles/s | {wall:>8.3f} s | {len(orders)} orders")
+
+    print("identical orders:", len(set(results.values())) == 1)
+
+
+if __name__ == "__main__":
+    main(collect_args())
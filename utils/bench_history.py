@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: benchmark the history reads of Database (row dicts vs bulk columns)
+    :usage: $ python -m utils.bench_history -d 30 --chunk 10000
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import os
+import time
+
+import asyncpg
+
+from crypto.cache import HistoryCache
+from crypto.database import Database
+from crypto.warehouse import Warehouse
+
+SYMBOL = "benchusdt"
+
+
+def collect_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--days", type=int, default=30,
+                        help="number of days of 1m candles to read")
+    parser.add_argument("--chunk", type=int, default=10000,
+                        help="number of candles per chunk (HISTORY_CHUNK_SIZE)")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="number of runs of each reader, the best one is kept")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the benchmark candles in the db")
+    args = parser.parse_args()
+    return args
+
+
+class Sink:
+    """Null exchange counting the replies it receives"""
+
+    def __init__(self):
+        self.messages = 0
+
+    async def publish(self, message, routing_key: str):
+        self.messages += 1
+
+
+async def legacy_read(conn: asyncpg.Connection, start: datetime, stop: datetime, chunk_size: int):
+    """The previous reader: `SELECT *` through a cursor, one dict per row"""
+    async with conn.transaction():
+        cursor = await conn.cursor("""
+                SELECT * from ohlc
+                WHERE symbol = $1 AND frequency = $2
+                    AND timestamp >= $3 AND timestamp < $4
+                ORDER BY timestamp;
+            """, SYMBOL, "1m", start, stop)
+        while rows := await cursor.fetch(chunk_size):
+            yield [{"t": row["timestamp"], "o": row["open"], "h": row["high"],
+                    "l": row["low"], "c": row["close"], "v": row["vol"]} for row in rows]
+
+
+async def measure(name: str, run, rows: int, repeat: int):
+    """Best of `repeat` runs of the coroutine function `run`"""
+    best = float("inf")
+    for _ in range(repeat):
+        wall = time.perf_counter()
+        await run()
+        best = min(best, time.perf_counter() - wall)
+    print(f"{name:>16} | {rows / best:>12,.0f} rows/s | {best:>7.3f} s")
+
+
+async def main(args: argparse.Namespace):
+    os.environ["HISTORY_CHUNK_SIZE"] = str(args.chunk)
+    db = Database(asyncio.get_event_loop())
+    db.cache = HistoryCache(max_bytes=0)
+    db.pool = await asyncpg.create_pool(db.DATABASE_URI)
+    db.exchange = Sink()
+
+    start = datetime(2021, 1, 1)
+    stop = start + timedelta(days=args.days)
+    count = args.days * 24 * 60
+    candles = [[start + timedelta(minutes=i), SYMBOL, "1m", 1. + i, 2. + i, .5 + i, 1.5 + i, 10. + i]
+               for i in range(count)]
+    async with db.pool.acquire() as conn:
+        await conn.execute("DELETE FROM ohlc WHERE symbol = $1", SYMBOL)
+        await conn.execute("DELETE FROM ohlc_coverage WHERE symbol = $1", SYMBOL)
+        async with conn.transaction():
+            await Warehouse.copy(conn, "ohlc", candles)
+            await db.coverage.add(conn, SYMBOL, "1m", [(start, stop)])
+    print(f"{count:,} candles of 1m, chunks of {args.chunk:,}")
+
+    try:
+        async with db.pool.acquire() as conn:
+            async def dicts():
+                async for _ in legacy_read(conn, start, stop, args.chunk):
+                    pass
+
+            async def columns():
+                async for _ in db.stored(conn, SYMBOL, "1m", (start, stop)):
+                    pass
+
+            await measure("read dicts", dicts, count, args.repeat)
+            await measure("read columns", columns, count, args.repeat)
+
+        for fmt in ["json", "columnar"]:
+            request = {"asset": SYMBOL, "asset_type": "futures", "frequency": "1m", "versionID": "bench",
+                       "date_interval": [start.date(), (stop - timedelta(days=1)).date()], "format": fmt}
+            await measure(f"request {fmt}", lambda: db.query_ohlc_data(request), count, args.repeat)
+    finally:
+        if not args.keep:
+            async with db.pool.acquire() as conn:
+                await conn.execute("DELETE FROM ohlc WHERE symbol = $1", SYMBOL)
+                await conn.execute("DELETE FROM ohlc_coverage WHERE symbol = $1", SYMBOL)
+        await db.pool.close()
+        await db.klines.close()
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main(collect_args()))
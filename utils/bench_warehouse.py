@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: benchmark the Warehouse queue consumer (spin loop vs batch draining)
+    :usage: $ python -m utils.bench_warehouse -n 200000 --idle 5
+"""
+import argparse
+import asyncio
+from asyncio import Queue
+from datetime import datetime
+import time
+
+from crypto.warehouse import Warehouse
+
+
+def collect_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--rows", type=int, default=200000,
+                        help="number of tick rows to push through the consumer")
+    parser.add_argument("-b", "--batch", type=int, default=1000,
+                        help="batch size of the draining consumer")
+    parser.add_argument("--idle", type=float, default=5.,
+                        help="time (s) to measure the consumer with no traffic")
+    args = parser.parse_args()
+    return args
+
+
+class Sink:
+    """Null database writer counting the rows it receives"""
+
+    def __init__(self):
+        self.rows = 0
+
+    async def write(self, table: str, rows: list):
+        self.rows += len(rows)
+
+
+async def spin_consumer(queue: Queue, sink: Sink, batch_size: int = 10):
+    """The previous `while True: await asyncio.sleep(0)` consumer"""
+    buffer = []
+    while True:
+        await asyncio.sleep(0)
+        if not queue.empty():
+            rows, _ = await queue.get()
+            buffer.extend(rows)
+        if len(buffer) >= batch_size:
+            await sink.write("ticker", buffer)
+            buffer = []
+
+
+async def measure(name: str, consumer, queue: Queue, sink: Sink, args: argparse.Namespace):
+    """Run `consumer` over a burst of rows and an idle period"""
+    item = ([[datetime.now(), 1., 1., 1., 1.]], None)
+    for _ in range(args.rows):
+        queue.put_nowait(item)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    task = asyncio.ensure_future(consumer)
+    while sink.rows < args.rows:
+        await asyncio.sleep(0.001)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    idle_cpu = time.process_time()
+    await asyncio.sleep(args.idle)
+    idle_cpu = time.process_time() - idle_cpu
+    task.cancel()
+
+    print(f"{name:>8} | {args.rows / wall:>12,.0f} rows/s | {cpu / args.rows * 1000 * 1000:>8.2f} ms CPU/1k rows"
+          f" | {idle_cpu / args.idle * 100:>6.1f}% CPU idle")
+
+
+async def main(args: argparse.Namespace):
+    loop = asyncio.get_event_loop()
+    warehouse = Warehouse(loop, ticker_batch=args.batch, flush_interval=1.)
+
+    sink = Sink()
+    await measure("spin", spin_consumer(queue := Queue(), sink), queue, sink, args)
+
+    sink = Sink()
+    warehouse.insert = sink.write
+    await measure("drain", warehouse.drain(queue := Queue(), args.batch, "ticker"), queue, sink, args)
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main(collect_args()))
@@ -0,0 +1,68 @@
+"""
+    :author: pk13055
+    :brief: columnar binary encoding of candles for bulk history transfers
+"""
+import struct
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+# value of the `format` request field and `content_type` of the replies
+COLUMNAR = "columnar"
+CONTENT_TYPE = "application/x-ohlcv"
+
+# magic (name + version) and number of candles, followed by the columns
+MAGIC = b"OHLCV\x00\x01\x00"
+HEADER = struct.Struct("<8sQ")
+COLUMNS = ("t", "o", "h", "l", "c", "v")
+
+
+def encode_candles(candles: Union[List[Dict], Dict[str, np.ndarray]]) -> bytes:
+    """Pack candles (a list of `{t, o, h, l, c, v}` or a dict of columns) into a frame
+
+    Times are stored as int64 epoch milliseconds (the naive timestamps taken as UTC),
+    followed by the float64 open, high, low, close and volume columns.
+    """
+    if not isinstance(candles, dict):
+        candles = candle_columns(candles)
+    times = np.asarray(candles["t"], dtype="datetime64[ms]").astype("<i8")
+    return b"".join(
+        [HEADER.pack(MAGIC, len(times)), times.tobytes()]
+        + [np.asarray(candles[column], dtype="<f8").tobytes() for column in COLUMNS[1:]]
+    )
+
+
+def decode_candles(payload: bytes) -> Dict[str, np.ndarray]:
+    """Unpack a frame into `{t: datetime64[ms], o, h, l, c, v: float64}` arrays (no copy)"""
+    magic, count = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError(f"not a candle frame (magic {magic!r})")
+    if len(payload) != HEADER.size + count * 8 * len(COLUMNS):
+        raise ValueError(f"truncated candle frame ({len(payload)} bytes for {count} candles)")
+    offset = HEADER.size
+    columns = {"t": np.frombuffer(payload, "<i8", count, offset).view("datetime64[ms]")}
+    for column in COLUMNS[1:]:
+        offset += count * 8
+        columns[column] = np.frombuffer(payload, "<f8", count, offset)
+    return columns
+
+
+def candle_records(columns: Dict[str, Sequence]) -> List[Dict]:
+    """Convert columns (arrays or sequences of datetime/float) back to a list of `{t, o, h, l, c, v}`"""
+    if isinstance(columns["t"], np.ndarray):
+        columns = dict(
+            {column: np.asarray(columns[column], dtype="f8").tolist() for column in COLUMNS[1:]},
+            t=columns["t"].astype("datetime64[us]").tolist(),
+        )
+    return [dict(zip(COLUMNS, candle)) for candle in zip(*(columns[column] for column in COLUMNS))]
+
+
+def candle_columns(candles: List[Dict]) -> Dict[str, np.ndarray]:
+    """Convert a list of `{t, o, h, l, c, v}` to `{t: datetime64[ms], o, h, l, c, v: float64}` arrays"""
+    times = pd.DatetimeIndex([candle["t"] for candle in candles]).values.astype("datetime64[ms]")
+    return {
+        "t": times,
+        **{column: np.array([candle[column] for candle in candles], dtype="f8") for column in COLUMNS[1:]},
+    }
@@ -2,10 +2,10 @@ from enum import Enum
 
 
 class StreamType(str, Enum):
-    """Types of streams to fetch data from"""
+    """Types of streams to fetch data from (`<symbol>@<type>`)"""
 
-    MARK_PRICE = "btcusdt@markPrice@1s"
-    LAST_PRICE = "btcusdt@bookTicker"
+    MARK_PRICE = "markPrice@1s"
+    LAST_PRICE = "bookTicker"
 
     def __repr__(self):
         return self.value
@@ -46,3 +46,13 @@ class MessageCounter(int, Enum):
 
     def __repr__(self):
         return self.value
+
+
+class AckMode(str, Enum):
+    """When consumed messages are acknowledged"""
+
+    RECEIVE = "receive"  # as soon as they are queued in memory (at-most-once)
+    COMMIT = "commit"  # once the rows they carry are written (at-least-once)
+
+    def __repr__(self):
+        return self.value
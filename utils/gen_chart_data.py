@@ -19,6 +19,7 @@ import asyncio
 import pandas as pd
 
 from analysis import generate_metrics
+from columnar import COLUMNAR, CONTENT_TYPE, decode_candles
 from encoder import NpEncoder, EnhancedJSONEncoder, EnhancedJSONDecoder
 from enums import MessageCounter
 
@@ -26,7 +27,7 @@ from enums import MessageCounter
 loop = asyncio.get_event_loop()
 args = None
 exchange = None
-old_candles: List[Dict] = []
+old_candles: List[pd.DataFrame] = []
 orders: List[Dict] = []
 metrics = None
 messages: int = MessageCounter.RESET
@@ -49,6 +50,12 @@ def collect_args() -> argparse.Namespace:
     parser.add_argument(
         "-f", "--frequency", type=str, default="1m", help="Candle frequency $num[m/h/d]"
     )
+    parser.add_argument(
+        "--format",
+        type=str,
+        default=COLUMNAR,
+        help="Format of the history data [json/columnar]",
+    )
     parser.add_argument(
         "--asset_class",
         type=str,
@@ -66,17 +73,16 @@ def collect_args() -> argparse.Namespace:
     return args
 
 
-async def candle_handler(new_candles: List[Dict]) -> None:
+async def candle_handler(new_candles: pd.DataFrame, eos: bool = True) -> None:
     """Updates the candles and on completion writes to file"""
     global old_candles, messages
-    old_candles.extend(new_candles)
+    old_candles.append(new_candles)
+    # every request is answered by chunks, the last of which marks the end of stream
+    if not eos:
+        return
     messages += MessageCounter.RECEIVE
     if messages <= 0:
-        ohlc = (
-            pd.DataFrame.from_dict(list(old_candles))
-            .set_index("Timestamp")
-            .sort_index()
-        )
+        ohlc = pd.concat(old_candles).set_index("Timestamp").sort_index()
         candles_out_file = args.candles if args.candles != "" else "candles.csv"
         ohlc.to_csv(candles_out_file)
 
@@ -95,8 +101,13 @@ async def candle_handler(new_candles: List[Dict]) -> None:
 async def on_message(message: IncomingMessage, *args, **kwargs) -> None:
     """Callback function which routes message to necessary function"""
     async with message.process():
-        data = json.loads(message.body, cls=EnhancedJSONDecoder)
-        df = pd.DataFrame(data)
+        if message.content_type == CONTENT_TYPE:
+            df = pd.DataFrame(decode_candles(message.body))
+        else:
+            df = pd.DataFrame(
+                json.loads(message.body, cls=EnhancedJSONDecoder),
+                columns=["t", "o", "h", "l", "c", "v"],
+            )
         df.drop_duplicates()
         df = df.rename(
             index=str,
@@ -109,7 +120,10 @@ async def on_message(message: IncomingMessage, *args, **kwargs) -> None:
                 "v": "Volume",
             },
         )
-        await candle_handler(df.to_dict(orient="records"))
+        headers = message.headers or {}
+        if headers.get("error"):
+            sys.stderr.write(f"[error] gen_chart_data: history request failed: {headers['error']}\n")
+        await candle_handler(df, headers.get("eos", True))
 
 
 async def setup_exchanges() -> dict:
@@ -149,6 +163,7 @@ def publish_candle_message(
         "frequency": args.frequency,
         "asset_type": args.type,
         "versionID": versionID,
+        "format": args.format,
     }
     asyncio.ensure_future(
         exchange.publish(
@@ -237,7 +252,7 @@ async def parse_candles(filename: str) -> dict:
     return (
         df.Timestamp.min().date(),
         df.Timestamp.max().date(),
-        df.to_dict(orient="records"),
+        [df],
     )
 
 
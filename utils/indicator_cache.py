@@ -0,0 +1,73 @@
+"""
+    :author: pk13055
+    :brief: indicator series memoized by (data fingerprint, indicator, params)
+"""
+import hashlib
+import os
+from typing import Sequence
+
+import numpy as np
+import talib
+
+try:
+    from utils.tiered_cache import TieredCache
+except ModuleNotFoundError:
+    # imported by `./backtest.py` run as a script, next to its siblings
+    from tiered_cache import TieredCache
+
+
+class IndicatorCache(TieredCache):
+    """talib indicator series of past backtests
+
+    Series are kept in memory and on disk (`.npy` files) by `TieredCache`,
+    memory mapped when read back so processes sharing the directory share
+    the pages.
+    """
+
+    suffix = ".npy"
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, directory: str = None,
+                 max_disk_bytes: int = 4 * 1024 * 1024 * 1024):
+        super().__init__(max_bytes, directory, max_disk_bytes)
+
+    @staticmethod
+    def fingerprint(*arrays: Sequence) -> str:
+        """Digest of the data the indicators are computed on, to be computed once per dataset"""
+        digest = hashlib.blake2b(digest_size=16)
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.data)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    @staticmethod
+    def nbytes(series: np.ndarray) -> int:
+        return series.nbytes
+
+    @staticmethod
+    def read(path: str) -> np.ndarray:
+        return np.load(path, mmap_mode="r")
+
+    @staticmethod
+    def write(f, series: np.ndarray):
+        np.save(f, series)
+
+    def series(self, fingerprint: str, name: str, *inputs: np.ndarray, **params) -> np.ndarray:
+        """talib `name` of `inputs` with `params`, computed on a miss (read only)
+
+        :Params:
+            - fingerprint: `fingerprint` of the dataset `inputs` are columns of
+            - name: talib function, eg: EMA, ADX
+            - inputs: input arrays of the function
+            - params: parameters of the function, eg: timeperiod=14
+        """
+        key = "-".join([fingerprint, name] + [f"{param}{value}" for param, value in sorted(params.items())])
+        series = self.get(key)
+        if series is None:
+            series = getattr(talib, name)(*(np.asarray(x, dtype=float) for x in inputs), **params)
+            series.flags.writeable = False
+            self.put(key, series)
+        return series
@@ -0,0 +1,259 @@
+"""
+    :author: pk13055
+    :brief: streaming indicators updated in O(1) per candle, matching talib
+"""
+from collections import deque
+import math
+
+NAN = float("nan")
+
+
+def is_zero(value: float) -> bool:
+    """talib's `TA_IS_ZERO`"""
+    return -1e-8 < value < 1e-8
+
+
+def true_range(high: float, low: float, prev_close: float) -> float:
+    """Largest of the candle range and the gaps from the previous close"""
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class Indicator:
+    """Base class of the streaming indicators
+
+    `update` takes a `{t, o, h, l, c, v}` candle and returns the new `value`,
+    nan until enough candles have been seen (the talib lookback).
+    """
+
+    __slots__ = ("period", "value", "count")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.value = NAN
+        # number of candles seen
+        self.count = 0
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    def update(self, candle: dict) -> float:
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    """Simple moving average of `field` (talib SMA)"""
+
+    __slots__ = ("field", "window", "total")
+
+    def __init__(self, period: int, field: str = "c"):
+        super().__init__(period)
+        self.field = field
+        self.window = deque(maxlen=period)
+        self.total = 0.
+
+    def update(self, candle: dict) -> float:
+        return self.push(candle[self.field])
+
+    def push(self, value: float) -> float:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        self.count += 1
+        if self.count >= self.period:
+            self.value = self.total / self.period
+        return self.value
+
+
+class Extremum(Indicator):
+    """Highest (or lowest) `field` of the last `period` candles (talib MAX/MIN)
+
+    Candidates are kept in a monotonic deque, each candle is pushed and popped once.
+    """
+
+    __slots__ = ("field", "sign", "candidates")
+
+    def __init__(self, period: int, field: str, lowest: bool = False):
+        super().__init__(period)
+        self.field = field
+        self.sign = -1 if lowest else 1
+        # (index, signed value), values decreasing
+        self.candidates = deque()
+
+    def update(self, candle: dict) -> float:
+        value = self.sign * candle[self.field]
+        while self.candidates and self.candidates[-1][1] <= value:
+            self.candidates.pop()
+        self.candidates.append((self.count, value))
+        if self.candidates[0][0] <= self.count - self.period:
+            self.candidates.popleft()
+        self.count += 1
+        if self.count >= self.period:
+            self.value = self.sign * self.candidates[0][1]
+        return self.value
+
+
+class Max(Extremum):
+    """Highest `field` of the last `period` candles (talib MAX)"""
+
+    __slots__ = ()
+
+    def __init__(self, period: int, field: str = "h"):
+        super().__init__(period, field)
+
+
+class Min(Extremum):
+    """Lowest `field` of the last `period` candles (talib MIN)"""
+
+    __slots__ = ()
+
+    def __init__(self, period: int, field: str = "l"):
+        super().__init__(period, field, lowest=True)
+
+
+class EMA(Indicator):
+    """Exponential moving average of `field`, seeded with the SMA of the first `period` values (talib EMA)"""
+
+    __slots__ = ("field", "k", "total")
+
+    def __init__(self, period: int, field: str = "c"):
+        super().__init__(period)
+        self.field = field
+        self.k = 2. / (period + 1)
+        self.total = 0.
+
+    def update(self, candle: dict) -> float:
+        return self.push(candle[self.field])
+
+    def push(self, value: float) -> float:
+        self.count += 1
+        if self.count < self.period:
+            self.total += value
+        elif self.count == self.period:
+            self.value = (self.total + value) / self.period
+        else:
+            self.value = ((value - self.value) * self.k) + self.value
+        return self.value
+
+
+class ATR(Indicator):
+    """Wilder smoothed average true range (talib ATR)"""
+
+    __slots__ = ("prev_close", "total")
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.prev_close = NAN
+        self.total = 0.
+
+    def update(self, candle: dict) -> float:
+        self.count += 1
+        if self.count > 1:
+            tr = true_range(candle["h"], candle["l"], self.prev_close)
+            if self.count <= self.period:
+                self.total += tr
+            elif self.count == self.period + 1:
+                self.value = (self.total + tr) / self.period
+            else:
+                self.value = ((self.value * (self.period - 1)) + tr) / self.period
+        self.prev_close = candle["c"]
+        return self.value
+
+
+class RSI(Indicator):
+    """Wilder relative strength index of `field` (talib RSI)"""
+
+    __slots__ = ("field", "prev", "gain", "loss")
+
+    def __init__(self, period: int = 14, field: str = "c"):
+        super().__init__(period)
+        self.field = field
+        self.prev = NAN
+        # sums of the first `period` gains/losses, then their Wilder averages
+        self.gain = self.loss = 0.
+
+    def update(self, candle: dict) -> float:
+        value, period = candle[self.field], self.period
+        self.count += 1
+        if self.count > 1:
+            change = value - self.prev
+            if self.count > period + 1:
+                self.gain *= period - 1
+                self.loss *= period - 1
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+            if self.count > period:
+                self.gain /= period
+                self.loss /= period
+                total = self.gain + self.loss
+                if not is_zero(total):
+                    self.value = 100. * (self.gain / total)
+                elif not self.ready:
+                    self.value = 0.
+        self.prev = value
+        return self.value
+
+
+class ADX(Indicator):
+    """Wilder average directional index along with the +DI/-DI (talib ADX, PLUS_DI, MINUS_DI)
+
+    The DIs are available from the `period + 1`th candle, the ADX from the `2 * period`th.
+    """
+
+    __slots__ = ("plus_di", "minus_di", "plus_dm", "minus_dm", "tr",
+                 "prev_high", "prev_low", "prev_close", "dx_total")
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.plus_di = self.minus_di = NAN
+        # sums of the first `period - 1` moves, then their Wilder smoothed values
+        self.plus_dm = self.minus_dm = self.tr = 0.
+        self.prev_high = self.prev_low = self.prev_close = NAN
+        self.dx_total = 0.
+
+    def update(self, candle: dict) -> float:
+        high, low, period = candle["h"], candle["l"], self.period
+        self.count += 1
+        if self.count > 1:
+            diff_plus, diff_minus = high - self.prev_high, self.prev_low - low
+            tr = true_range(high, low, self.prev_close)
+            if self.count > period:
+                self.plus_dm -= self.plus_dm / period
+                self.minus_dm -= self.minus_dm / period
+                self.tr = self.tr - (self.tr / period) + tr
+            else:
+                self.tr += tr
+            if diff_minus > 0 and diff_plus < diff_minus:
+                self.minus_dm += diff_minus
+            elif diff_plus > 0 and diff_plus > diff_minus:
+                self.plus_dm += diff_plus
+
+            if self.count > period:
+                dx = self.directional_index()
+                if self.count <= 2 * period:
+                    # the first ADX is the average of the first `period` DX
+                    if not math.isnan(dx):
+                        self.dx_total += dx
+                    if self.count == 2 * period:
+                        self.value = self.dx_total / period
+                elif not math.isnan(dx):
+                    self.value = ((self.value * (period - 1)) + dx) / period
+        self.prev_high, self.prev_low, self.prev_close = high, low, candle["c"]
+        return self.value
+
+    def directional_index(self) -> float:
+        """Update the DIs from the smoothed moves, the DX (nan if undefined)"""
+        if is_zero(self.tr):
+            # NOTE: like talib, the DIs are held while there is no range
+            if math.isnan(self.plus_di):
+                self.plus_di = self.minus_di = 0.
+            return NAN
+        self.minus_di = 100. * (self.minus_dm / self.tr)
+        self.plus_di = 100. * (self.plus_dm / self.tr)
+        total = self.minus_di + self.plus_di
+        if is_zero(total):
+            return NAN
+        return 100. * (abs(self.minus_di - self.plus_di) / total)
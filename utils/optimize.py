@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: parameter sweep of the EMA cross/ADX strategy over a process pool
+    :usage: $ python -m utils.optimize -c configs/default.cfg --stage optimize
+"""
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import random
+import sys
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.analysis import generate_metrics
+from utils.backtest import ENGINES, add_indicators
+from utils.config_parser import collect_configs
+from utils.indicator_cache import IndicatorCache
+from utils.shm import Spec, attach, share
+
+# parameters swept by the optimizer, `rr` is derived from `sl` and `tp`
+PARAMS = ("ema_fast", "ema_slow", "adx", "sl", "tp")
+COLUMNS = ("Timestamp", "Open", "High", "Low", "Close")
+# columns of the backtest orders, the metrics of a tradeless set are computed on none
+ORDERS = ("entry_time", "exit_time", "trade_type", "exit_high", "exit_low", "entry_price", "status")
+
+# shared memory block, OHLC data and indicator cache of a worker process
+_block, _candles, _indicators = None, None, None
+
+
+def parse_range(value) -> List:
+    """Values of a `start:stop:step` range (stop included), or of a single value"""
+    if not isinstance(value, str):
+        return [value]
+    if ":" not in value:
+        return [float(value) if "." in value else int(value)]
+    bounds = value.split(":")
+    cast = float if any("." in bound for bound in bounds) else int
+    start, stop, step = (cast(bound) for bound in bounds) if len(bounds) == 3 else (*map(cast, bounds), 1)
+    return [cast(x) for x in np.arange(start, stop + step / 2, step)]
+
+
+def combinations(params: dict) -> List[Dict]:
+    """Parameter sets to evaluate, the full grid or `samples` random picks from it"""
+    ranges = {param: parse_range(params[param]) for param in PARAMS}
+    grid = [
+        combination for combination in (dict(zip(PARAMS, values)) for values in itertools.product(*ranges.values()))
+        if combination["ema_fast"] < combination["ema_slow"]
+    ]
+    if params.get("search", "grid") == "random":
+        return random.Random(params.get("seed")).sample(grid, min(int(params.get("samples", 100)), len(grid)))
+    return grid
+
+
+def init_worker(spec: Spec, fingerprint: str, cache_bytes: int, cache_dir: str) -> None:
+    """Attach a worker process to the shared OHLC data"""
+    global _block, _candles, _indicators
+    _block, columns = attach(spec)
+    _candles = pd.DataFrame(columns, copy=False)
+    _indicators = (IndicatorCache(cache_bytes, cache_dir), fingerprint)
+
+
+def evaluate(combination: dict, engine: str = "vector") -> dict:
+    """Backtest a parameter set on the shared data, the overall metrics of its orders"""
+    candles = add_indicators(_candles.copy(deep=False), combination["ema_fast"],
+                             combination["ema_slow"], combination["adx"], *_indicators)
+    orders = ENGINES[engine](candles, combination["sl"], combination["tp"] / combination["sl"])
+    # NOTE: a tradeless set still gets every metric (nan where undefined) so it can be ranked
+    return {**combination, **generate_metrics(pd.DataFrame(orders, columns=ORDERS))["overall"].to_dict()}
+
+
+def optimize(params: dict) -> pd.DataFrame:
+    """Evaluate the parameter sets of the OPTIMIZE section, ranked by the `rank` metric
+
+    :Params:
+        - params: config section with the data (`input`), the parameter ranges,
+          `search` [grid/random], `samples`, `seed`, `workers`, `rank`, `output`
+          and the indicator cache `indicator_cache_bytes` and `indicator_cache` (directory)
+    """
+    df = pd.read_csv(params.get("input", "data/binance_data.csv"), parse_dates=[0])
+    block, spec = share({column: df[column].to_numpy() for column in COLUMNS})
+    fingerprint = IndicatorCache.fingerprint(df.High, df.Low, df.Close)
+    cache = (int(params.get("indicator_cache_bytes") or 512 * 1024 * 1024), params.get("indicator_cache") or None)
+
+    sets = combinations(params)
+    workers = int(params.get("workers") or 0) or os.cpu_count()
+    print(f"Optimizing | {len(sets)} parameter sets on {len(df)} candles, {workers} workers")
+    try:
+        with ProcessPoolExecutor(workers, initializer=init_worker,
+                                 initargs=(spec, fingerprint, *cache)) as pool:
+            results = []
+            for i, result in enumerate(pool.map(evaluate, sets, chunksize=max(1, len(sets) // (workers * 4)))):
+                results.append(result)
+                if (i + 1) % max(1, len(sets) // 100) == 0 or i + 1 == len(sets):
+                    print(f"Optimizing | [{i + 1}/{len(sets)}]", end="\r", flush=True)
+    finally:
+        block.close()
+        block.unlink()
+
+    rank = params.get("rank", "Profit")
+    results = pd.DataFrame(results).sort_values(rank, ascending=False, ignore_index=True)
+    print()
+    print(results.head(int(params.get("top", 10))).to_string())
+    if params.get("output"):
+        results.to_csv(params["output"], index=False)
+    return results
+
+
+if __name__ == "__main__":
+    sections, args = collect_configs()
+    if args.stage != "optimize":
+        sys.stderr.write("[error] optimize: run with `--stage optimize`\n")
+        sys.exit(1)
+    optimize(sections)
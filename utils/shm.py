@@ -0,0 +1,38 @@
+"""
+    :author: pk13055
+    :brief: share numpy columns between processes through a shared memory block
+"""
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# name of the block and (column, dtype, offset, length) of each array in it
+Spec = Tuple[str, List[Tuple[str, str, int, int]]]
+
+
+def share(columns: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, Spec]:
+    """Copy columns into a new shared memory block
+
+    The owner must `close` and `unlink` the block once the other processes are done.
+    """
+    arrays = {name: np.ascontiguousarray(column) for name, column in columns.items()}
+    block = shared_memory.SharedMemory(create=True, size=max(1, sum(a.nbytes for a in arrays.values())))
+    layout, offset = [], 0
+    for name, array in arrays.items():
+        np.ndarray(array.shape, array.dtype, block.buf, offset)[:] = array
+        layout.append((name, array.dtype.str, offset, len(array)))
+        offset += array.nbytes
+    return block, (block.name, layout)
+
+
+def attach(spec: Spec) -> Tuple[shared_memory.SharedMemory, Dict[str, np.ndarray]]:
+    """Read only views of the columns shared by `share` (the block must be kept open while they are used)"""
+    name, layout = spec
+    block = shared_memory.SharedMemory(name=name)
+    columns = {}
+    for column, dtype, offset, length in layout:
+        columns[column] = np.ndarray((length,), dtype, block.buf, offset)
+        columns[column].flags.writeable = False
+    return block, columns
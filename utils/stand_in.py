@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+    :author: pk13055
+    :brief: local stand-in for the binance websocket and klines endpoints
+    :usage: $ ./stand_in.py -i frames.jsonl  # then run with BINANCE_WS_URI=ws://localhost:8765/stream
+            (and BINANCE_KLINES_URI=http://localhost:8765/api/v3/klines)
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+import random
+import time
+
+from aiohttp import web
+
+# seconds per unit of a kline interval, eg: "15m", "4h", "1d" (months are served by calendar)
+UNITS = {"m": 60, "h": 60 * 60, "d": 24 * 60 * 60, "w": 7 * 24 * 60 * 60}
+# NOTE: the epoch is a thursday, weekly klines open on mondays
+WEEK_OFFSET = 4 * 24 * 60 * 60
+
+
+def collect_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--input", type=str, default="",
+                        help="canned combined stream frames (one json message per line)")
+    parser.add_argument("-p", "--port", type=int, default=8765,
+                        help="port to listen on")
+    parser.add_argument("-r", "--rate", type=float, default=1.,
+                        help="frames (per stream) sent per second, 0 for no delay")
+    parser.add_argument("--loop", action="store_true",
+                        help="restart the canned frames when exhausted")
+    parser.add_argument("-w", "--weight-limit", type=int, default=1200,
+                        help="klines request weight allowed per minute before answering 429")
+    parser.add_argument("--latency", type=float, default=0.,
+                        help="delay (s) added to every klines response")
+    args = parser.parse_args()
+    return args
+
+
+def synthetic_frames(streams: list):
+    """Generate mark price and book ticker frames for the subscribed streams"""
+    prices = {stream.split("@")[0]: 100 * random.random() + 1000 for stream in streams}
+    while True:
+        event = int(time.time() * 1000)
+        for stream in streams:
+            symbol, stream_type = stream.split("@", 1)
+            price = prices[symbol] = prices[symbol] + random.gauss(0, 1)
+            if stream_type.startswith("markPrice"):
+                data = {"e": "markPriceUpdate", "E": event, "s": symbol.upper(), "p": f"{price:.2f}"}
+            else:
+                data = {
+                    "e": "bookTicker", "E": event, "s": symbol.upper(),
+                    "b": f"{price - 0.5:.2f}", "B": f"{random.random():.3f}",
+                    "a": f"{price + 0.5:.2f}", "A": f"{random.random():.3f}",
+                }
+            yield {"stream": stream, "data": data}
+
+
+def canned_frames(filename: str, streams: list, repeat: bool):
+    """Replay the frames in `filename` belonging to the subscribed streams"""
+    while True:
+        with open(filename) as f:
+            for line in f:
+                frame = json.loads(line)
+                if frame["stream"] in streams:
+                    yield frame
+        if not repeat:
+            return
+
+
+async def stream_handler(request: web.Request) -> web.WebSocketResponse:
+    """Serve a combined stream (`/stream?streams=a/b/c`)"""
+    args = request.app["args"]
+    streams = request.query.get("streams", "").split("/")
+    ws = web.WebSocketResponse(autoping=True)
+    await ws.prepare(request)
+
+    frames = canned_frames(args.input, streams, args.loop) if args.input \
+        else synthetic_frames(streams)
+    delay = 1 / (args.rate * len(streams)) if args.rate else 0
+    sender = asyncio.ensure_future(send_frames(ws, frames, delay))
+    # NOTE: incoming frames are read so the close frame of the client is answered
+    async for _ in ws:
+        pass
+    sender.cancel()
+    return ws
+
+
+async def send_frames(ws: web.WebSocketResponse, frames, delay: float):
+    """Send the frames of a stream, then close it"""
+    for frame in frames:
+        if ws.closed:
+            return
+        await ws.send_str(json.dumps(frame))
+        await asyncio.sleep(delay)
+    await ws.close()
+
+
+def kline_times(start: int, stop: int, interval: str) -> list:
+    """`(open, close)` times (epoch ms) of the klines opening in `[start, stop]`"""
+    count, unit = int(interval[:-1]), interval[-1]
+    if unit == "M":
+        # NOTE: monthly klines open on the first of the (UTC) calendar month
+        def month_start(month: int) -> int:
+            return int(datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+        first = datetime.fromtimestamp(start / 1000, timezone.utc)
+        month, times = first.year * 12 + first.month - 1, []
+        while month_start(month) <= stop:
+            if month_start(month) >= start:
+                times.append((month_start(month), month_start(month + count) - 1))
+            month += count
+        return times
+    period = count * UNITS[unit] * 1000
+    offset = WEEK_OFFSET * 1000 if period % (UNITS["w"] * 1000) == 0 else 0
+    return [(t, t + period - 1) for t in range(start + (offset - start) % period, stop + 1, period)]
+
+
+def synthetic_klines(start: int, stop: int, interval: str) -> list:
+    """Deterministic klines opening in `[start, stop]` (epoch ms), up to the current one"""
+    now = int(time.time() * 1000)
+    klines = []
+    for t, close in kline_times(start, min(stop, now), interval):
+        rng = random.Random(t)
+        o = 1000 + 100 * rng.random()
+        c = o + rng.gauss(0, 1)
+        h, l = max(o, c) + rng.random(), min(o, c) - rng.random()
+        klines.append([t, f"{o:.2f}", f"{h:.2f}", f"{l:.2f}", f"{c:.2f}", f"{100 * rng.random():.3f}",
+                       close, "0", 0, "0", "0", "0"])
+    return klines
+
+
+async def klines_handler(request: web.Request) -> web.Response:
+    """Serve `/api/v3/klines`, tracking the request weight like the real endpoint"""
+    args, app = request.app["args"], request.app
+    window = int(time.time() // 60)
+    if window != app["window"]:
+        app["window"], app["weight"] = window, 0
+    limit = min(int(request.query.get("limit", 500)), 1000)
+    app["weight"] += 1 if limit < 100 else 2 if limit < 500 else 5
+    headers = {"X-MBX-USED-WEIGHT-1M": str(app["weight"])}
+    if app["weight"] > args.weight_limit:
+        headers["Retry-After"] = str(60 - int(time.time() % 60))
+        return web.json_response({"code": -1003, "msg": "Too many requests"}, status=429, headers=headers)
+
+    try:
+        interval = request.query["interval"]
+        start = int(request.query.get("startTime", 0))
+        stop = int(request.query.get("endTime", time.time() * 1000))
+        klines = synthetic_klines(start, stop, interval)[:limit]
+    except (KeyError, ValueError):
+        return web.json_response({"code": -1120, "msg": "Invalid interval."}, status=400, headers=headers)
+    if args.latency:
+        await asyncio.sleep(args.latency)
+    return web.json_response(klines, headers=headers)
+
+
+def main():
+    args = collect_args()
+    app = web.Application()
+    app["args"] = args
+    app["window"], app["weight"] = None, 0
+    app.router.add_get("/stream", stream_handler)
+    app.router.add_get("/api/v3/klines", klines_handler)
+    web.run_app(app, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
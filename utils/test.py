@@ -18,9 +18,10 @@ async def main():
     async with asyncpg.create_pool(DATABASE_URI, command_timeout=60) as pool:
         async with pool.acquire() as conn:
             # insert test row
-            row = [datetime.datetime.now()] + [100 * random.random() for _ in range(5)]
+            row = [datetime.datetime.now(), "btcusdt", "1m"] + [100 * random.random() for _ in range(5)]
             await conn.execute('''
-                INSERT into ohlc(timestamp, open, high, low, close, vol) VALUES($1, $2, $3, $4, $5, $6)
+                INSERT into ohlc(timestamp, symbol, frequency, open, high, low, close, vol)
+                    VALUES($1, $2, $3, $4, $5, $6, $7, $8)
             ''', *row)
             async with conn.transaction():
                 async for row in conn.cursor('''
@@ -0,0 +1,84 @@
+"""
+    :author: pk13055
+    :brief: resolve backtest exits on candles touching both the TP and SL from the stored ticks
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import asyncpg
+
+
+def ambiguous(order: dict, sl_points: float, rr: float) -> bool:
+    """Whether the exit candle of an order touched both its TP and its SL"""
+    if order['trade_type'] == "LONG":
+        tp, sl = order['entry_price'] + (sl_points * rr), order['entry_price'] - sl_points
+        return order['exit_high'] >= tp and order['exit_low'] <= sl
+    tp, sl = order['entry_price'] - (sl_points * rr), order['entry_price'] + sl_points
+    return order['exit_low'] <= tp and order['exit_high'] >= sl
+
+
+async def fetch_ticks(uri: str, symbol: str, starts: List[datetime],
+                      period: timedelta) -> List[Tuple[datetime, datetime, float]]:
+    """(candle start, time, mark price) of the ticks within the given candles, in order
+
+    All the candles are fetched in a single query, as one index range scan each.
+    """
+    conn = await asyncpg.connect(uri)
+    try:
+        return await conn.fetch("""
+                SELECT candle.start, ticker.timestamp, ticker.mark
+                FROM unnest($2::timestamp[]) AS candle(start)
+                JOIN ticker ON ticker.symbol = $1
+                    AND ticker.timestamp >= candle.start AND ticker.timestamp < candle.start + $3::interval
+                ORDER BY candle.start, ticker.timestamp;
+            """, symbol, sorted(set(starts)), period)
+    finally:
+        await conn.close()
+
+
+async def resolve_exits(orders: List[dict], uri: str, symbol: str, period: timedelta,
+                        sl_points: float, rr: float) -> Dict[str, int]:
+    """Set the status of the orders exited on ambiguous candles from the first of TP/SL the ticks reached
+
+    Candles without ticks, or whose ticks reach neither, keep the TP first status.
+
+    :Params:
+        - orders: orders of the backtest, updated in place
+        - uri: database with the `ticker` table
+        - symbol: symbol of the ticks
+        - period: duration of the candles
+        - sl_points: stoploss distance
+        - rr: risk reward ratio 1:X
+    """
+    pending = sorted((order for order in orders if ambiguous(order, sl_points, rr)),
+                     key=lambda order: order['exit_time'])
+    stats = {"ambiguous": len(pending), "resolved": 0, "flipped": 0}
+    if not pending:
+        return stats
+    ticks = await fetch_ticks(uri, symbol, [order['exit_time'].to_pydatetime() for order in pending], period)
+
+    # merge join of the orders and the ticks, both ordered by exit candle
+    i = 0
+    for order in pending:
+        start = order['exit_time'].to_pydatetime()
+        while i < len(ticks) and ticks[i][0] < start:
+            i += 1
+        long = order['trade_type'] == "LONG"
+        tp = order['entry_price'] + (sl_points * rr if long else -sl_points * rr)
+        sl = order['entry_price'] + (-sl_points if long else sl_points)
+        j = i
+        while j < len(ticks) and ticks[j][0] == start:
+            mark = ticks[j][2]
+            # NOTE: `Status` values of utils/backtest.py
+            if (mark >= tp) if long else (mark <= tp):
+                status = 1
+            elif (mark <= sl) if long else (mark >= sl):
+                status = 0
+            else:
+                j += 1
+                continue
+            stats["resolved"] += 1
+            stats["flipped"] += status != order['status']
+            order['status'] = status
+            break
+    return stats
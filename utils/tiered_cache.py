@@ -0,0 +1,150 @@
+"""
+    :author: pk13055
+    :brief: two tier (memory LRU + disk) cache, the base of the history and indicator caches
+"""
+from collections import OrderedDict
+import contextlib
+import glob
+import os
+import tempfile
+from typing import Any, Hashable, Optional
+
+
+class TieredCache:
+    """Values kept in memory in least recently used order up to `max_bytes`
+
+    Values are written through to `directory` (if given) as `<path(key)>`
+    files, the directory being bounded to `max_disk_bytes` by evicting the
+    least recently used files. Processes may share the directory: files are
+    published under unique temporary names and may vanish (trimmed by
+    another process) at any time, which is a miss.
+
+    Subclasses name the file of a key (`path`, ending in `suffix`) and may
+    change how values are sized, read and written.
+    """
+
+    # extension of the files of the disk tier
+    suffix = ""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, directory: str = None,
+                 max_disk_bytes: int = 4 * 1024 * 1024 * 1024):
+        """Initialize the tiers
+
+        :Params:
+            - max_bytes: max total size of the values kept in memory
+            - directory: directory of the disk tier, disabled if not given
+            - max_disk_bytes: max total size of the values kept on disk
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.size = 0
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Counters to size the tiers"""
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def path(self, key: Hashable) -> str:
+        """File of an entry in the disk tier"""
+        raise NotImplementedError
+
+    @staticmethod
+    def nbytes(value) -> int:
+        return len(value)
+
+    @staticmethod
+    def read(path: str):
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def write(f, value):
+        f.write(value)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Value of an entry, from memory or disk, None on a miss"""
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.directory:
+            try:
+                value = self.read(self.path(key))
+                os.utime(self.path(key))
+            except (FileNotFoundError, ValueError):
+                value = None
+            if value is not None:
+                self.disk_hits += 1
+                self.remember(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value):
+        """Add an entry to both tiers"""
+        self.remember(key, value)
+        if self.directory:
+            self.save(self.path(key), value)
+
+    def remember(self, key: Hashable, value):
+        """Add an entry to the memory tier, evicting the least recently used ones"""
+        if self.nbytes(value) > self.max_bytes:
+            return
+        self.forget(key)
+        self.entries[key] = value
+        self.size += self.nbytes(value)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= self.nbytes(evicted)
+            self.evictions += 1
+
+    def forget(self, key: Hashable) -> bool:
+        """Drop an entry from the memory tier, return whether it was there"""
+        if key not in self.entries:
+            return False
+        self.size -= self.nbytes(self.entries.pop(key))
+        return True
+
+    def save(self, path: str, value):
+        """Publish a value to the disk tier"""
+        # NOTE: written under a unique temporary name so a crash or a concurrent
+        # writer never leaves a partial file, the last complete write wins
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self.write(f, value)
+            os.replace(tmp, path)
+        except (FileNotFoundError, ValueError):
+            # the file lost to another process, it stays a miss
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            return
+        self.trim_disk()
+
+    def trim_disk(self):
+        """Delete the least recently used files past `max_disk_bytes`"""
+        # NOTE: other processes may share (and trim) the directory
+        files = []
+        for file in glob.glob(os.path.join(self.directory, f"*{self.suffix}")):
+            with contextlib.suppress(FileNotFoundError):
+                files.append((os.path.getmtime(file), os.path.getsize(file), file))
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, file in sorted(files):
+            if size <= self.max_disk_bytes:
+                break
+            size -= file_size
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(file)
+                self.evictions += 1